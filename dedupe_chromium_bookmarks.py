@@ -1,70 +1,148 @@
 #!/usr/bin/env python3
-import argparse, os, sys, time, re
-from html.parser import HTMLParser
-from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import argparse, functools, hashlib, io, os, sys, time, re
+from html import unescape
+from urllib.parse import urlsplit, urlunsplit
 from dataclasses import dataclass, field
-from typing import List, Optional, Tuple, Dict, Set
+from typing import BinaryIO, List, Optional, Tuple, Dict, Set, Iterator
 
-COMMON_TRACKING_PARAMS = {
+try:
+    from lxml import etree  # optional: libxml2-backed streaming parser
+except ImportError:
+    etree = None
+
+try:
+    import xxhash  # optional: fast 64-bit fingerprints for the seen-set
+except ImportError:
+    xxhash = None
+
+COMMON_TRACKING_PARAMS = frozenset({
     "utm_source","utm_medium","utm_campaign","utm_term","utm_content",
     "utm_id","gclid","fbclid","mc_cid","mc_eid","igshid","ref"
-}
+})
 
+# Plain ASCII "scheme://host[/path][?query][#frag]" (no IPv6 brackets): the
+# shape of nearly every bookmark. For these, urlsplit/urlunsplit would return
+# exactly what the regex groups give, so normalize_url skips them.
+_SIMPLE_URL_RE = re.compile(r"([A-Za-z][A-Za-z0-9+.-]*)://([^/?#\[\]]+)([/?#].*)?", re.S)
+
+# Exports merged from several browsers repeat the same URLs many times.
+# Bounded so the cache doesn't end up holding every URL string the
+# fingerprint seen-set was meant to save.
+@functools.lru_cache(maxsize=1 << 16)
 def normalize_url(u: str) -> str:
     try:
-        s = urlsplit(u)
-        scheme = s.scheme.lower()
-        netloc = s.netloc.lower()
-        path = s.path
+        # isprintable() rules out the whitespace/control chars urlsplit strips
+        m = _SIMPLE_URL_RE.fullmatch(u) if u.isascii() and u.isprintable() and u[:1] != " " else None
+        if m:
+            scheme, netloc, rest = m.group(1), m.group(2), m.group(3) or ""
+            path, _, query = rest.partition("#")[0].partition("?")
+        else:
+            s = urlsplit(u)
+            scheme, netloc, path, query = s.scheme, s.netloc, s.path, s.query
+        scheme = scheme.lower()
+        netloc = netloc.lower()
         if path.endswith("/") and path != "/":
             path = path.rstrip("/")
-        query_pairs = [(k, v) for k, v in parse_qsl(s.query, keep_blank_values=True)]
-        filtered = [(k, v) for (k, v) in query_pairs if k not in COMMON_TRACKING_PARAMS]
-        query = urlencode(filtered, doseq=True)
+        # Drop tracking params by name; other params are kept verbatim
+        # (no percent-decoding / re-encoding round-trip)
+        query = "&".join(p for p in query.split("&")
+                         if p and p.split("=", 1)[0] not in COMMON_TRACKING_PARAMS)
+        if m:
+            return f"{scheme}://{netloc}{path}?{query}" if query else f"{scheme}://{netloc}{path}"
         return urlunsplit((scheme, netloc, path, query, "")) or u
     except Exception:
         return u
 
-@dataclass
+def url_fingerprint(norm: str) -> int:
+    """64-bit digest of a normalized URL; the seen-set stores these instead of strings."""
+    data = norm.encode("utf-8", "surrogatepass")
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+@dataclass(slots=True)
 class Bookmark:
     href: str
     title: str
-    attrs: Dict[str, str] = field(default_factory=dict)
+    # Only the BOOKMARK_ATTRS that are set, in that order; HREF lives in href
+    attrs: Tuple[Tuple[str, str], ...] = ()
 
-@dataclass
+@dataclass(slots=True)
 class Folder:
     name: str
     attrs: Dict[str, str] = field(default_factory=dict)
     children: List[object] = field(default_factory=list)  # Bookmark | Folder
 
-class NetscapeParser(HTMLParser):
+# Single-pass tokenizer for the only tags that matter. H3/A bodies may contain
+# inline markup but never cross another structural tag. Tag heads skip over
+# ="..." / ='...' values, so a '>' inside a quoted value does not end the tag;
+# a quote anywhere else is plain text (HREF=http://x.org/it's). Comments are
+# matched first and dropped, as lxml does, so commented-out entries stay out.
+_ATTRS = r"""(?:[^>"'=]|=\s*(?:"[^"]*"|'[^']*'|(?=[^"'\s]))|["'])*"""
+_HEAD = "(" + _ATTRS + ")"
+_INNER = r"([^<]*(?:(?:<!--.*?-->|<(?!/?(?:A|H3|DT|DL)\b))[^<]*)*)"
+_TOKEN_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<DL\b[^>]*>"
+    r"|</DL\s*>"
+    r"|<H3\b" + _HEAD + ">" + _INNER + r"</H3\s*>"
+    r"|<A\b" + _HEAD + ">" + _INNER + r"</A\s*>",
+    re.I | re.S,
+)
+# name="v" | name='v' | name=v | bare name (value None, as html.parser reports it)
+_ATTR_RE = re.compile(r"""([^\s"'=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]*)))?""")
+_OPEN_RE = re.compile(r"<(?:A|H3)\b", re.I)
+# Inline markup inside titles; a '<' not followed by a tag name is text
+_TAG_RE = re.compile(r"<!--.*?-->|</?[A-Za-z]" + _ATTRS + ">", re.S)
+
+def _parse_attrs(s: str) -> List[Tuple[str, Optional[str]]]:
+    attrs = []
+    for m in _ATTR_RE.finditer(s):
+        kind = m.lastindex
+        attrs.append((m.group(1), unescape(m.group(kind)) if kind > 1 else None))
+    return attrs
+
+# Attributes carried over to the output <A> tags (besides HREF)
+BOOKMARK_ATTRS = ("ADD_DATE", "ICON", "ICON_URI", "LAST_MODIFIED")
+
+def _canon_attrs(attrs) -> Dict[str, str]:
+    # Upper-case attribute names once at parse time so output code can do a
+    # single lookup; interning shares one key object across all bookmarks.
+    return {sys.intern(k.upper()): v for k, v in attrs}
+
+class NetscapeParser:
     """
     Minimal parser for Netscape bookmark format:
       <DL><p>
         <DT><H3 ...>Folder</H3>
         <DL><p>...</DL><p>
         <DT><A HREF="...">Title</A>
+    Tokens are pulled out with one compiled regex (see _TOKEN_RE); lxml can
+    also drive the handle_* methods directly (see parse_with_lxml).
+    Duplicate URLs are dropped as they are parsed (first occurrence wins).
     """
     def __init__(self):
-        super().__init__(convert_charrefs=True)
+        self._buf = ""
         self.root = Folder("ROOT")
         self.stack: List[Folder] = [self.root]
         self._pending_folder_title: Optional[Tuple[str, Dict[str,str]]] = None
         self._collect_text_for: Optional[str] = None  # "H3" or "A"
         self._temp_attrs: Dict[str,str] = {}
         self._text_buf: List[str] = []
+        self.seen: Set[int] = set()
+        self.stats: Dict[str, int] = {"urls_kept": 0, "urls_removed": 0, "folders_pruned": 0}
 
+    # Tag names are always passed in lowercase
     def handle_starttag(self, tag, attrs):
-        a = dict(attrs)
-        if tag.upper() == "H3":
+        if tag == "h3":
             self._collect_text_for = "H3"
-            self._temp_attrs = a
+            self._temp_attrs = _canon_attrs(attrs)
             self._text_buf = []
-        elif tag.upper() == "A":
+        elif tag == "a":
             self._collect_text_for = "A"
-            self._temp_attrs = a
+            self._temp_attrs = _canon_attrs(attrs)
             self._text_buf = []
-        elif tag.upper() == "DL":
+        elif tag == "dl":
             # Opening a child list: if we have a pending folder title, create it now
             if self._pending_folder_title:
                 name, fattrs = self._pending_folder_title
@@ -72,26 +150,34 @@ class NetscapeParser(HTMLParser):
                 self.stack[-1].children.append(folder)
                 self.stack.append(folder)
                 self._pending_folder_title = None
-        elif tag.upper() == "DT":
+        elif tag == "dt":
             # No action; structure marker
             pass
 
     def handle_endtag(self, tag):
-        if tag.upper() == "H3" and self._collect_text_for == "H3":
+        if tag == "h3" and self._collect_text_for == "H3":
             name = "".join(self._text_buf).strip()
-            self._pending_folder_title = (name, dict(self._temp_attrs))
+            self._pending_folder_title = (name, self._temp_attrs)
             self._collect_text_for = None
             self._text_buf = []
             self._temp_attrs = {}
-        elif tag.upper() == "A" and self._collect_text_for == "A":
+        elif tag == "a" and self._collect_text_for == "A":
             title = "".join(self._text_buf).strip()
-            href = self._temp_attrs.get("HREF") or self._temp_attrs.get("href") or ""
-            bm = Bookmark(href=href, title=title, attrs=dict(self._temp_attrs))
-            self.stack[-1].children.append(bm)
+            a = self._temp_attrs
+            href = a.get("HREF") or ""
+            norm = normalize_url(href)
+            if norm and (fp := url_fingerprint(norm)) not in self.seen:
+                self.seen.add(fp)
+                bm = Bookmark(href=href, title=title,
+                              attrs=tuple((k, a[k]) for k in BOOKMARK_ATTRS if a.get(k) is not None))
+                self.stack[-1].children.append(bm)
+                self.stats["urls_kept"] += 1
+            else:
+                self.stats["urls_removed"] += 1
             self._collect_text_for = None
             self._text_buf = []
             self._temp_attrs = {}
-        elif tag.upper() == "DL":
+        elif tag == "dl":
             # Close current folder if we are inside one (but not the root)
             if len(self.stack) > 1:
                 self.stack.pop()
@@ -101,63 +187,162 @@ class NetscapeParser(HTMLParser):
         if self._collect_text_for in ("H3", "A"):
             self._text_buf.append(data)
 
-def prune_and_dedupe(folder: Folder, seen: Set[str], stats: Dict[str,int]) -> Optional[Folder]:
-    new_children: List[object] = []
-    for ch in folder.children:
-        if isinstance(ch, Bookmark):
-            norm = normalize_url(ch.href)
-            if norm and norm not in seen:
-                seen.add(norm)
-                new_children.append(ch)
-                stats["urls_kept"] += 1
+    def feed(self, data: str) -> None:
+        """Scan data for tokens; an incomplete trailing token is kept for the next call."""
+        buf = self._buf + data
+        end = 0
+        for m in _TOKEN_RE.finditer(buf):
+            # An unterminated comment hides everything after it until "-->"
+            # arrives, so stop here and keep it buffered.
+            comment = buf.find("<!--", end, m.start())
+            if comment != -1:
+                end = comment
+                break
+            kind = m.lastindex
+            if kind is None:
+                c = m.group(0)[1]
+                if c == "/":
+                    self.handle_endtag("dl")
+                elif c != "!":
+                    self.handle_starttag("dl", ())
+                elif _OPEN_RE.search(buf, end, m.start()):
+                    # Comment inside an H3/A whose end tag is still to come
+                    break
             else:
-                stats["urls_removed"] += 1
-        elif isinstance(ch, Folder):
-            pruned = prune_and_dedupe(ch, seen, stats)
-            if pruned and pruned.children:
-                new_children.append(pruned)
+                # 1/2: H3 attrs/text, 3/4: A attrs/text
+                tag = "h3" if kind == 2 else "a"
+                self.handle_starttag(tag, _parse_attrs(m.group(kind - 1)))
+                text = m.group(kind)
+                if "<" in text:
+                    text = _TAG_RE.sub("", text)
+                self.handle_data(unescape(text))
+                self.handle_endtag(tag)
+            end = m.end()
+        self._buf = buf[end:]
+
+    def close(self) -> None:
+        self._buf = ""
+
+def parse_with_lxml(path: str, parser: NetscapeParser) -> bool:
+    """
+    Stream the export through lxml's iterparse and drive the same handlers
+    NetscapeParser uses, clearing elements as we go so memory stays flat.
+    Returns False if libxml2 gave up part-way (e.g. its nesting-depth limit).
+    """
+    ctx = etree.iterparse(path, events=("start", "end"), html=True,
+                          huge_tree=True, encoding="utf-8")
+    in_text = 0  # open <H3>/<A> elements; their inline children must survive
+    for event, elem in ctx:
+        tag = elem.tag
+        if not isinstance(tag, str):
+            # Comments / processing instructions
+            continue
+        if event == "start":
+            if tag in ("h3", "a"):
+                in_text += 1
+            if tag in ("h3", "a", "dl"):
+                parser.handle_starttag(tag, elem.items())
+            continue
+        if tag in ("h3", "a"):
+            # lxml has already decoded entities
+            parser.handle_data("".join(elem.itertext()))
+            in_text -= 1
+        if tag in ("h3", "a", "dl"):
+            parser.handle_endtag(tag)
+        if in_text:
+            continue
+        elem.clear()
+        # Top-level nodes (e.g. the leading comment) have no parent to prune
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+    return not any(e.level == etree.ErrorLevels.FATAL for e in ctx.error_log)
+
+READ_CHUNK = 64 * 1024
+WRITE_BUFFER = 1 << 20
+
+def parse_bookmarks(path: str) -> Tuple[Folder, Dict[str,int]]:
+    """Return the parsed tree and the dedupe counters gathered while parsing."""
+    parser = NetscapeParser()
+    if etree is not None and parse_with_lxml(path, parser):
+        return parser.root, parser.stats
+    parser = NetscapeParser()
+    # Feed in fixed-size chunks instead of slurping the whole file
+    with open(path, "rb", buffering=READ_CHUNK) as raw, \
+            io.TextIOWrapper(raw, encoding="utf-8", errors="replace") as f:
+        while (chunk := f.read(READ_CHUNK)):
+            parser.feed(chunk)
+    parser.close()
+    return parser.root, parser.stats
+
+def prune_empty_folders(folder: Folder, stats: Dict[str,int]) -> Folder:
+    """Drop folders left empty after dedupe (URLs are already deduped by the parser)."""
+    # Iterative DFS so deeply nested exports can't hit the recursion limit.
+    # Each frame is (folder, iterator over its children, children kept so far);
+    # a folder is finalized once its iterator is exhausted (post-order).
+    stack: List[Tuple[Folder, Iterator[object], List[object]]] = [(folder, iter(folder.children), [])]
+    while stack:
+        node, it, new_children = stack[-1]
+        for ch in it:
+            if isinstance(ch, Bookmark):
+                new_children.append(ch)
+            elif isinstance(ch, Folder):
+                stack.append((ch, iter(ch.children), []))
+                break
             else:
-                stats["folders_pruned"] += 1
+                # Unknown node; skip to keep output tidy
+                pass
         else:
-            # Unknown node; skip to keep output tidy
-            pass
-    folder.children = new_children
+            stack.pop()
+            node.children = new_children
+            if stack:
+                if node.children:
+                    stack[-1][2].append(node)
+                else:
+                    stats["folders_pruned"] += 1
     return folder
 
+_HTML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
 def escape_html(t: str) -> str:
-    return (t.replace("&", "&amp;")
-             .replace("<", "&lt;")
-             .replace(">", "&gt;")
-             .replace('"', "&quot;"))
-
-def dump_folder(folder: Folder, indent: int=0) -> str:
-    out = []
-    ind = "  " * indent
-    for ch in folder.children:
-        if isinstance(ch, Folder):
-            name = escape_html(ch.name or "Untitled")
-            # Preserve a couple of common attributes if present
-            h3_attrs = []
-            for k in ("ADD_DATE","LAST_MODIFIED","PERSONAL_TOOLBAR_FOLDER"):
-                v = ch.attrs.get(k) or ch.attrs.get(k.lower())
-                if v is not None:
-                    h3_attrs.append(f'{k}="{escape_html(str(v))}"')
-            attrs_str = (" " + " ".join(h3_attrs)) if h3_attrs else ""
-            out.append(f'{ind}<DT><H3{attrs_str}>{name}</H3>')
-            out.append(f'{ind}<DL><p>')
-            out.append(dump_folder(ch, indent+1))
-            out.append(f'{ind}</DL><p>')
-        elif isinstance(ch, Bookmark):
-            href = escape_html(ch.href or "")
-            title = escape_html(ch.title or ch.href or "Untitled")
-            a_attrs = [f'HREF="{href}"']
-            # Preserve ADD_DATE / ICON if available
-            for k in ("ADD_DATE", "ICON", "ICON_URI", "LAST_MODIFIED"):
-                v = ch.attrs.get(k) or ch.attrs.get(k.lower())
-                if v is not None:
-                    a_attrs.append(f'{k}="{escape_html(str(v))}"')
-            out.append(f'{ind}<DT><A {" ".join(a_attrs)}>{title}</A>')
-    return "\n".join(out)
+    return t.translate(_HTML_ESCAPES)
+
+def dump_folder(folder: Folder, out: BinaryIO, indent: int=0) -> None:
+    """
+    Write folder's children to out as UTF-8 lines. Every level shares the
+    same writer; an explicit stack replaces recursion so depth is unbounded.
+    """
+    write = out.write
+    stack: List[Tuple[Iterator[object], int]] = [(iter(folder.children), indent)]
+    while stack:
+        it, level = stack[-1]
+        ind = "  " * level
+        for ch in it:
+            if isinstance(ch, Folder):
+                name = escape_html(ch.name or "Untitled")
+                # Preserve a couple of common attributes if present
+                h3_attrs = []
+                for k in ("ADD_DATE","LAST_MODIFIED","PERSONAL_TOOLBAR_FOLDER"):
+                    v = ch.attrs.get(k)
+                    if v is not None:
+                        h3_attrs.append(f'{k}="{escape_html(str(v))}"')
+                attrs_str = (" " + " ".join(h3_attrs)) if h3_attrs else ""
+                write(f'{ind}<DT><H3{attrs_str}>{name}</H3>\n{ind}<DL><p>\n'.encode("utf-8"))
+                stack.append((iter(ch.children), level + 1))
+                break
+            elif isinstance(ch, Bookmark):
+                href = escape_html(ch.href or "")
+                title = escape_html(ch.title or ch.href or "Untitled")
+                a_attrs = [f'HREF="{href}"']
+                # Preserve ADD_DATE / ICON if available
+                for k, v in ch.attrs:
+                    a_attrs.append(f'{k}="{escape_html(v)}"')
+                write(f'{ind}<DT><A {" ".join(a_attrs)}>{title}</A>\n'.encode("utf-8"))
+        else:
+            stack.pop()
+            if stack:
+                write(f'{"  " * (level - 1)}</DL><p>\n'.encode("utf-8"))
 
 def write_netscape_html(folder: Folder, out_path: str):
     header = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
@@ -167,12 +352,12 @@ def write_netscape_html(folder: Folder, out_path: str):
 <H1>Bookmarks</H1>
 <DL><p>
 """
-    body = dump_folder(folder, 1)
-    footer = "\n</DL><p>\n"
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(header)
-        f.write(body)
-        f.write(footer)
+    footer = "</DL><p>\n"
+    # Encode lines ourselves into a large binary buffer (no TextIOWrapper layer)
+    with open(out_path, "wb", buffering=WRITE_BUFFER) as f:
+        f.write(header.encode("utf-8"))
+        dump_folder(folder, f, 1)
+        f.write(footer.encode("utf-8"))
 
 def main():
     ap = argparse.ArgumentParser(description="De-duplicate Netscape/HTML bookmark export and keep first occurrence of each URL.")
@@ -184,15 +369,8 @@ def main():
         print(f"Error: file not found: {args.input_html}", file=sys.stderr)
         sys.exit(1)
 
-    with open(args.input_html, "r", encoding="utf-8", errors="replace") as f:
-        text = f.read()
-
-    parser = NetscapeParser()
-    parser.feed(text)
-
-    stats = {"urls_kept": 0, "urls_removed": 0, "folders_pruned": 0}
-    root = parser.root
-    pruned = prune_and_dedupe(root, seen=set(), stats=stats)
+    root, stats = parse_bookmarks(args.input_html)
+    pruned = prune_empty_folders(root, stats)
 
     out_path = args.output or re.sub(r"\.html?$", "", args.input_html, flags=re.I) + ".dedup.html"
     write_netscape_html(pruned, out_path)
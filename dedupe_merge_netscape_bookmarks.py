@@ -1,56 +1,147 @@
 #!/usr/bin/env python3
 
-import argparse, os, sys, re
-from html.parser import HTMLParser
-from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import argparse, functools, hashlib, io, os, sys, re
+from html import unescape
+from urllib.parse import urlsplit, urlunsplit
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Optional, Tuple, Dict, Set
+from typing import List, Optional, Tuple, Dict, Set, Iterator
 
+try:
+    from lxml import etree  # optional: libxml2-backed streaming parser
+except ImportError:
+    etree = None
 
-COMMON_TRACKING_PARAMS = {
+try:
+    import xxhash  # optional: fast 64-bit fingerprints for the seen-set
+except ImportError:
+    xxhash = None
+
+
+COMMON_TRACKING_PARAMS = frozenset({
     "utm_source","utm_medium","utm_campaign","utm_term","utm_content",
     "utm_id","gclid","fbclid","mc_cid","mc_eid","igshid","ref"
-}
+})
 
+# Plain ASCII "scheme://host[/path][?query][#frag]" (no IPv6 brackets): the
+# shape of nearly every bookmark. For these, urlsplit/urlunsplit would return
+# exactly what the regex groups give, so normalize_url skips them.
+_SIMPLE_URL_RE = re.compile(r"([A-Za-z][A-Za-z0-9+.-]*)://([^/?#\[\]]+)([/?#].*)?", re.S)
+
+# Exports merged from several browsers repeat the same URLs many times.
+# Bounded so the cache doesn't end up holding every URL string the
+# fingerprint seen-set was meant to save.
+@functools.lru_cache(maxsize=1 << 16)
 def normalize_url(u: str) -> str:
     try:
-        s = urlsplit(u)
-        scheme = s.scheme.lower()
-        netloc = s.netloc.lower()
-        path = s.path
+        # isprintable() rules out the whitespace/control chars urlsplit strips
+        m = _SIMPLE_URL_RE.fullmatch(u) if u.isascii() and u.isprintable() and u[:1] != " " else None
+        if m:
+            scheme, netloc, rest = m.group(1), m.group(2), m.group(3) or ""
+            path, _, query = rest.partition("#")[0].partition("?")
+        else:
+            s = urlsplit(u)
+            scheme, netloc, path, query = s.scheme, s.netloc, s.path, s.query
+        scheme = scheme.lower()
+        netloc = netloc.lower()
         if path.endswith("/") and path != "/":
             path = path.rstrip("/")
-        query_pairs = [(k, v) for k, v in parse_qsl(s.query, keep_blank_values=True)]
-        filtered = [(k, v) for (k, v) in query_pairs if k not in COMMON_TRACKING_PARAMS]
-        query = urlencode(filtered, doseq=True)
+        # Drop tracking params by name; other params are kept verbatim
+        # (no percent-decoding / re-encoding round-trip)
+        query = "&".join(p for p in query.split("&")
+                         if p and p.split("=", 1)[0] not in COMMON_TRACKING_PARAMS)
+        if m:
+            return f"{scheme}://{netloc}{path}?{query}" if query else f"{scheme}://{netloc}{path}"
         return urlunsplit((scheme, netloc, path, query, "")) or u
     except Exception:
         return u
 
+def url_fingerprint(norm: str) -> int:
+    """64-bit digest of a normalized URL; the seen-set stores these instead of strings."""
+    data = norm.encode("utf-8", "surrogatepass")
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
 
-@dataclass
+
+@dataclass(slots=True)
 class Bookmark:
     href: str
     title: str
-    attrs: Dict[str, str] = field(default_factory=dict)
+    # Only the BOOKMARK_ATTRS that are set, in that order; HREF lives in href
+    attrs: Tuple[Tuple[str, str], ...] = ()
 
-@dataclass
+    # Trees are pickled back from parse workers; the slots dataclass default
+    # (__getstate__ via fields()) is several times slower than this.
+    def __reduce__(self):
+        return (Bookmark, (self.href, self.title, self.attrs))
+
+@dataclass(slots=True)
 class Folder:
     name: str
     attrs: Dict[str, str] = field(default_factory=dict)
     children: List[object] = field(default_factory=list)  # Bookmark | Folder
 
-
-class NetscapeParser(HTMLParser):
+    def __reduce__(self):
+        return (Folder, (self.name, self.attrs, self.children))
+
+@dataclass(slots=True)
+class Bucket:
+    """All bookmarks collected under one normalized folder name."""
+    display_name: str
+    bookmarks: List[Bookmark] = field(default_factory=list)
+    h3_attrs: Dict[str, str] = field(default_factory=dict)
+
+
+# Single-pass tokenizer for the only tags that matter. H3/A bodies may contain
+# inline markup but never cross another structural tag. Tag heads skip over
+# ="..." / ='...' values, so a '>' inside a quoted value does not end the tag;
+# a quote anywhere else is plain text (HREF=http://x.org/it's). Comments are
+# matched first and dropped, as lxml does, so commented-out entries stay out.
+_ATTRS = r"""(?:[^>"'=]|=\s*(?:"[^"]*"|'[^']*'|(?=[^"'\s]))|["'])*"""
+_HEAD = "(" + _ATTRS + ")"
+_INNER = r"([^<]*(?:(?:<!--.*?-->|<(?!/?(?:A|H3|DT|DL)\b))[^<]*)*)"
+_TOKEN_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<DL\b[^>]*>"
+    r"|</DL\s*>"
+    r"|<H3\b" + _HEAD + ">" + _INNER + r"</H3\s*>"
+    r"|<A\b" + _HEAD + ">" + _INNER + r"</A\s*>",
+    re.I | re.S,
+)
+# name="v" | name='v' | name=v | bare name (value None, as html.parser reports it)
+_ATTR_RE = re.compile(r"""([^\s"'=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]*)))?""")
+_OPEN_RE = re.compile(r"<(?:A|H3)\b", re.I)
+# Inline markup inside titles; a '<' not followed by a tag name is text
+_TAG_RE = re.compile(r"<!--.*?-->|</?[A-Za-z]" + _ATTRS + ">", re.S)
+
+def _parse_attrs(s: str) -> List[Tuple[str, Optional[str]]]:
+    attrs = []
+    for m in _ATTR_RE.finditer(s):
+        kind = m.lastindex
+        attrs.append((m.group(1), unescape(m.group(kind)) if kind > 1 else None))
+    return attrs
+
+# Attributes carried over to the output <A> tags (besides HREF)
+BOOKMARK_ATTRS = ("ADD_DATE", "ICON", "ICON_URI", "LAST_MODIFIED")
+
+def _canon_attrs(attrs) -> Dict[str, str]:
+    # Upper-case attribute names once at parse time so output code can do a
+    # single lookup; interning shares one key object across all bookmarks.
+    return {sys.intern(k.upper()): v for k, v in attrs}
+
+class NetscapeParser:
     """
     Parses the common Netscape bookmark format:
       <DL><p>
         <DT><H3 ...>Folder</H3>
         <DL><p>...</DL><p>
         <DT><A HREF="...">Title</A>
+    Tokens are pulled out with one compiled regex (see _TOKEN_RE); lxml can
+    also drive the handle_* methods directly (see parse_with_lxml).
     """
     def __init__(self):
-        super().__init__(convert_charrefs=True)
+        self._buf = ""
         self.root = Folder("ROOT")
         self.stack: List[Folder] = [self.root]
         self._pending_folder_title: Optional[Tuple[str, Dict[str,str]]] = None
@@ -58,44 +149,44 @@ class NetscapeParser(HTMLParser):
         self._temp_attrs: Dict[str,str] = {}
         self._text_buf: List[str] = []
 
+    # Tag names are always passed in lowercase
     def handle_starttag(self, tag, attrs):
-        a = dict(attrs)
-        t = tag.upper()
-        if t == "H3":
+        if tag == "h3":
             self._collect_text_for = "H3"
-            self._temp_attrs = a
+            self._temp_attrs = _canon_attrs(attrs)
             self._text_buf = []
-        elif t == "A":
+        elif tag == "a":
             self._collect_text_for = "A"
-            self._temp_attrs = a
+            self._temp_attrs = _canon_attrs(attrs)
             self._text_buf = []
-        elif t == "DL":
+        elif tag == "dl":
             if self._pending_folder_title:
                 name, fattrs = self._pending_folder_title
                 folder = Folder(name=name, attrs=fattrs)
                 self.stack[-1].children.append(folder)
                 self.stack.append(folder)
                 self._pending_folder_title = None
-        elif t == "DT":
+        elif tag == "dt":
             pass
 
     def handle_endtag(self, tag):
-        t = tag.upper()
-        if t == "H3" and self._collect_text_for == "H3":
+        if tag == "h3" and self._collect_text_for == "H3":
             name = "".join(self._text_buf).strip()
-            self._pending_folder_title = (name, dict(self._temp_attrs))
+            self._pending_folder_title = (name, self._temp_attrs)
             self._collect_text_for = None
             self._text_buf = []
             self._temp_attrs = {}
-        elif t == "A" and self._collect_text_for == "A":
+        elif tag == "a" and self._collect_text_for == "A":
             title = "".join(self._text_buf).strip()
-            href = self._temp_attrs.get("HREF") or self._temp_attrs.get("href") or ""
-            bm = Bookmark(href=href, title=title, attrs=dict(self._temp_attrs))
+            a = self._temp_attrs
+            href = a.get("HREF") or ""
+            bm = Bookmark(href=href, title=title,
+                          attrs=tuple((k, a[k]) for k in BOOKMARK_ATTRS if a.get(k) is not None))
             self.stack[-1].children.append(bm)
             self._collect_text_for = None
             self._text_buf = []
             self._temp_attrs = {}
-        elif t == "DL":
+        elif tag == "dl":
             if len(self.stack) > 1:
                 self.stack.pop()
 
@@ -103,25 +194,160 @@ class NetscapeParser(HTMLParser):
         if self._collect_text_for in ("H3", "A"):
             self._text_buf.append(data)
 
+    def feed(self, data: str) -> None:
+        """Scan data for tokens; an incomplete trailing token is kept for the next call."""
+        buf = self._buf + data
+        end = 0
+        for m in _TOKEN_RE.finditer(buf):
+            # An unterminated comment hides everything after it until "-->"
+            # arrives, so stop here and keep it buffered.
+            comment = buf.find("<!--", end, m.start())
+            if comment != -1:
+                end = comment
+                break
+            kind = m.lastindex
+            if kind is None:
+                c = m.group(0)[1]
+                if c == "/":
+                    self.handle_endtag("dl")
+                elif c != "!":
+                    self.handle_starttag("dl", ())
+                elif _OPEN_RE.search(buf, end, m.start()):
+                    # Comment inside an H3/A whose end tag is still to come
+                    break
+            else:
+                # 1/2: H3 attrs/text, 3/4: A attrs/text
+                tag = "h3" if kind == 2 else "a"
+                self.handle_starttag(tag, _parse_attrs(m.group(kind - 1)))
+                text = m.group(kind)
+                if "<" in text:
+                    text = _TAG_RE.sub("", text)
+                self.handle_data(unescape(text))
+                self.handle_endtag(tag)
+            end = m.end()
+        self._buf = buf[end:]
+
+    def close(self) -> None:
+        self._buf = ""
+
+def parse_with_lxml(path: str, parser: NetscapeParser) -> bool:
+    """
+    Stream the export through lxml's iterparse and drive the same handlers
+    NetscapeParser uses, clearing elements as we go so memory stays flat.
+    Returns False if libxml2 gave up part-way (e.g. its nesting-depth limit).
+    """
+    ctx = etree.iterparse(path, events=("start", "end"), html=True,
+                          huge_tree=True, encoding="utf-8")
+    in_text = 0  # open <H3>/<A> elements; their inline children must survive
+    for event, elem in ctx:
+        tag = elem.tag
+        if not isinstance(tag, str):
+            # Comments / processing instructions
+            continue
+        if event == "start":
+            if tag in ("h3", "a"):
+                in_text += 1
+            if tag in ("h3", "a", "dl"):
+                parser.handle_starttag(tag, elem.items())
+            continue
+        if tag in ("h3", "a"):
+            # lxml has already decoded entities
+            parser.handle_data("".join(elem.itertext()))
+            in_text -= 1
+        if tag in ("h3", "a", "dl"):
+            parser.handle_endtag(tag)
+        if in_text:
+            continue
+        elem.clear()
+        # Top-level nodes (e.g. the leading comment) have no parent to prune
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+    return not any(e.level == etree.ErrorLevels.FATAL for e in ctx.error_log)
+
+READ_CHUNK = 64 * 1024
+WRITE_BUFFER = 1 << 20
+
+def parse_bookmarks(path: str) -> Tuple[Folder, Dict[str,int]]:
+    """
+    Return the parsed tree and the counters gathered while parsing. Same
+    shape as in dedupe_chromium_bookmarks; here dedupe runs later in
+    dedupe_bookmarks_globally, so there is nothing to count yet.
+    """
+    parser = NetscapeParser()
+    if etree is not None and parse_with_lxml(path, parser):
+        return parser.root, {}
+    parser = NetscapeParser()
+    # Feed in fixed-size chunks instead of slurping the whole file
+    with open(path, "rb", buffering=READ_CHUNK) as raw, \
+            io.TextIOWrapper(raw, encoding="utf-8", errors="replace") as f:
+        while (chunk := f.read(READ_CHUNK)):
+            parser.feed(chunk)
+    parser.close()
+    return parser.root, {}
+
+def _parse_flat(path: str) -> List[Tuple[int, object]]:
+    """
+    Worker entry point: parse path and return the tree as a pre-order list of
+    (parent index, node) with every Folder's children left empty, so pickling
+    the result never recurses however deep the folders are nested.
+    """
+    nodes: List[Tuple[int, object]] = []
+    root, _ = parse_bookmarks(path)
+    stack: List[Tuple[int, object]] = [(-1, root)]
+    while stack:
+        parent, node = stack.pop()
+        if isinstance(node, Folder):
+            stack.extend((len(nodes), ch) for ch in reversed(node.children))
+            node = Folder(node.name, node.attrs)
+        nodes.append((parent, node))
+    return nodes
+
+def _unflatten(nodes: List[Tuple[int, object]]) -> Folder:
+    """Rebuild the tree produced by _parse_flat (siblings come back in order)."""
+    built: List[object] = []
+    for parent, node in nodes:
+        if parent >= 0:
+            built[parent].children.append(node)
+        built.append(node)
+    return built[0]
+
+def parse_all(paths: List[str], jobs: int) -> Folder:
+    """
+    Parse every export and graft their top-level entries under one ROOT, in
+    input order. Files are parsed in worker processes when there are several;
+    dedupe still happens afterwards in this process, so first-seen order holds.
+    """
+    if len(paths) > 1 and jobs > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+            roots = [_unflatten(nodes) for nodes in pool.map(_parse_flat, paths)]
+    else:
+        roots = [parse_bookmarks(p)[0] for p in paths]
+    if len(roots) == 1:
+        return roots[0]
+    return Folder("ROOT", children=[ch for r in roots for ch in r.children])
+
 
 NBSP = "\u00A0"
+_WS_RE = re.compile(r"\s+")
 
+@functools.lru_cache(maxsize=4096)
 def norm_folder_name(name: str) -> str:
     """Case-insensitive; collapses whitespace (incl. nbsp) and trims light punctuation."""
     if name is None:
         name = ""
     n = name.replace(NBSP, " ")
-    n = re.sub(r"\s+", " ", n).strip().lower()
+    n = _WS_RE.sub(" ", n).strip().lower()
     n = n.strip("/|-:.·;")
     return n
 
+_HTML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
 def escape_html(t: str) -> str:
-    return (t.replace("&", "&amp;")
-             .replace("<", "&lt;")
-             .replace(">", "&gt;")
-             .replace('"', "&quot;"))
+    return t.translate(_HTML_ESCAPES)
 
-def collect_flat_buckets(root: Folder) -> Dict[str, Dict]:
+def collect_flat_buckets(root: Folder) -> Dict[str, Bucket]:
     """
     Traverse entire tree and build buckets by normalized folder name.
     Each bucket stores:
@@ -130,89 +356,84 @@ def collect_flat_buckets(root: Folder) -> Dict[str, Dict]:
       - h3_attrs: the first seen H3 attributes for that name (optional)
     Also collect bookmarks found directly under ROOT into an 'unsorted' bucket.
     """
-    buckets: Dict[str, Dict] = {}
+    buckets: Dict[str, Bucket] = {}
     unsorted_key = "__unsorted__"
-    buckets[unsorted_key] = {"display_name": "Unsorted", "bookmarks": [], "h3_attrs": {}}
+    buckets[unsorted_key] = Bucket(display_name="Unsorted")
 
     def add_to_bucket(folder_name: Optional[str], h3_attrs: Dict[str, str], items: List[object]):
         key = norm_folder_name(folder_name or "")
         if not key:
             key = unsorted_key
         if key not in buckets:
-            buckets[key] = {
-                "display_name": (folder_name or "Unsorted"),
-                "bookmarks": [],
-                "h3_attrs": dict(h3_attrs or {})
-            }
+            buckets[key] = Bucket(
+                display_name=(folder_name or "Unsorted"),
+                h3_attrs=dict(h3_attrs or {}),
+            )
         b = buckets[key]
         # keep first-seen display name / attrs
-        if not b.get("h3_attrs"):
-            b["h3_attrs"] = dict(h3_attrs or {})
+        if not b.h3_attrs:
+            b.h3_attrs = dict(h3_attrs or {})
         for it in items:
             if isinstance(it, Bookmark):
-                b["bookmarks"].append(it)
+                b.bookmarks.append(it)
 
-    def walk(node: Folder, parent: Optional[Folder]):
+    # Iterative pre-order walk (no recursion limit on deep trees); children are
+    # pushed in reverse so folders are visited in document order.
+    stack: List[Folder] = [root]
+    while stack:
+        node = stack.pop()
         if node is not root:
             add_to_bucket(node.name, node.attrs, node.children)
         else:
             add_to_bucket(None, {}, node.children)
-
-        for ch in node.children:
-            if isinstance(ch, Folder):
-                walk(ch, node)
-
-    walk(root, None)
+        stack.extend(ch for ch in reversed(node.children) if isinstance(ch, Folder))
     return buckets
 
-def dedupe_bookmarks_globally(buckets: Dict[str, Dict]) -> Tuple[Dict[str, Dict], Dict[str,int]]:
-    seen: Set[str] = set()
+def dedupe_bookmarks_globally(buckets: Dict[str, Bucket]) -> Tuple[Dict[str, Bucket], Dict[str,int]]:
+    seen: Set[int] = set()
     stats = {"urls_kept": 0, "urls_removed": 0, "folders_total": 0}
 
     for key, b in buckets.items():
         new_list: List[Bookmark] = []
-        for bm in b["bookmarks"]:
+        for bm in b.bookmarks:
             norm = normalize_url(bm.href)
-            if norm and norm not in seen:
-                seen.add(norm)
+            if norm and (fp := url_fingerprint(norm)) not in seen:
+                seen.add(fp)
                 new_list.append(bm)
                 stats["urls_kept"] += 1
             else:
                 stats["urls_removed"] += 1
-        b["bookmarks"] = new_list
-        if b["bookmarks"]:
+        b.bookmarks = new_list
+        if b.bookmarks:
             stats["folders_total"] += 1
     return buckets, stats
 
 
-def dump_flat_html(buckets: Dict[str, Dict]) -> str:
-    lines = []
+def dump_flat_html(buckets: Dict[str, Bucket]) -> Iterator[str]:
+    """Yield output lines for every non-empty bucket."""
     for key, b in buckets.items():
-        if not b["bookmarks"]:
+        if not b.bookmarks:
             continue
-        name = escape_html(b["display_name"] or "Untitled")
+        name = escape_html(b.display_name or "Untitled")
         # keep a few attrs if present
         h3_attrs = []
         for k in ("ADD_DATE","LAST_MODIFIED","PERSONAL_TOOLBAR_FOLDER"):
-            v = b["h3_attrs"].get(k) or b["h3_attrs"].get(k.lower())
+            v = b.h3_attrs.get(k)
             if v is not None:
                 h3_attrs.append(f'{k}="{escape_html(str(v))}"')
         attrs_str = (" " + " ".join(h3_attrs)) if h3_attrs else ""
-        lines.append(f'<DT><H3{attrs_str}>{name}</H3>')
-        lines.append(f'<DL><p>')
-        for bm in b["bookmarks"]:
+        yield f'<DT><H3{attrs_str}>{name}</H3>'
+        yield f'<DL><p>'
+        for bm in b.bookmarks:
             href = escape_html(bm.href or "")
             title = escape_html(bm.title or bm.href or "Untitled")
             a_attrs = [f'HREF="{href}"']
-            for k in ("ADD_DATE", "ICON", "ICON_URI", "LAST_MODIFIED"):
-                v = bm.attrs.get(k) or bm.attrs.get(k.lower())
-                if v is not None:
-                    a_attrs.append(f'{k}="{escape_html(str(v))}"')
-            lines.append(f'  <DT><A {" ".join(a_attrs)}>{title}</A>')
-        lines.append(f'</DL><p>')
-    return "\n".join(lines)
-
-def write_flat_file(buckets: Dict[str, Dict], out_path: str):
+            for k, v in bm.attrs:
+                a_attrs.append(f'{k}="{escape_html(v)}"')
+            yield f'  <DT><A {" ".join(a_attrs)}>{title}</A>'
+        yield f'</DL><p>'
+
+def write_flat_file(buckets: Dict[str, Bucket], out_path: str):
     header = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
 <!-- This is an automatically generated file.
      It will be read and overwritten. Do Not Edit! -->
@@ -220,35 +441,33 @@ def write_flat_file(buckets: Dict[str, Dict], out_path: str):
 <H1>Bookmarks</H1>
 <DL><p>
 """
-    body = dump_flat_html(buckets)
-    footer = "\n</DL><p>\n"
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(header)
-        f.write(body)
-        f.write(footer)
+    footer = "</DL><p>\n"
+    # Encode lines ourselves into a large binary buffer (no TextIOWrapper layer)
+    with open(out_path, "wb", buffering=WRITE_BUFFER) as f:
+        f.write(header.encode("utf-8"))
+        f.writelines((line + "\n").encode("utf-8") for line in dump_flat_html(buckets))
+        f.write(footer.encode("utf-8"))
 
 
 def main():
     ap = argparse.ArgumentParser(description="Flatten bookmarks: merge same-named folders globally, remove subfolders, dedupe URLs.")
-    ap.add_argument("input_html", help="Path to bookmarks HTML export (e.g., bookmarks_*.html)")
-    ap.add_argument("-o", "--output", help="Output HTML path (default: alongside input with .flat.html)")
+    ap.add_argument("input_html", nargs="+", help="Path(s) to bookmarks HTML export(s) (e.g., bookmarks_*.html); several are merged")
+    ap.add_argument("-o", "--output", help="Output HTML path (default: alongside the first input with .flat.html)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes for parsing multiple inputs (default: CPU count)")
     args = ap.parse_args()
 
-    if not os.path.isfile(args.input_html):
-        print(f"Error: file not found: {args.input_html}", file=sys.stderr)
-        sys.exit(1)
-
-    with open(args.input_html, "r", encoding="utf-8", errors="replace") as f:
-        text = f.read()
+    for path in args.input_html:
+        if not os.path.isfile(path):
+            print(f"Error: file not found: {path}", file=sys.stderr)
+            sys.exit(1)
 
-    parser = NetscapeParser()
-    parser.feed(text)
+    root = parse_all(args.input_html, args.jobs)
 
     # Build buckets (1 per folder name globally), then dedupe across all
-    buckets = collect_flat_buckets(parser.root)
+    buckets = collect_flat_buckets(root)
     buckets, stats = dedupe_bookmarks_globally(buckets)
 
-    out_path = args.output or re.sub(r"\.html?$", "", args.input_html, flags=re.I) + ".flat.html"
+    out_path = args.output or re.sub(r"\.html?$", "", args.input_html[0], flags=re.I) + ".flat.html"
     write_flat_file(buckets, out_path)
 
     print("Wrote flattened + merged HTML to:", out_path)
@@ -0,0 +1,206 @@
+import os
+import sys
+from urllib.parse import urlsplit, urlunsplit
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dedupe_chromium_bookmarks as chromium  # noqa: E402
+import dedupe_merge_netscape_bookmarks as flat  # noqa: E402
+
+SCRIPTS = [chromium, flat]
+
+# Same shape Chrome / Firefox / Edge write, including the leading comment
+REAL_EXPORT = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<!-- This is an automatically generated file.
+     It will be read and overwritten.
+     DO NOT EDIT! -->
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3 ADD_DATE="1" LAST_MODIFIED="2">Folder <i>one</i></H3>
+    <DL><p>
+        <DT><A HREF="https://a.example/" ADD_DATE="3">Foo <b>bold</b></A>
+        <DT><A HREF="https://a.example">Dup</A>
+    </DL><p>
+    <DT><A HREF="https://top.example/">Top &amp; more</A>
+</DL><p>
+"""
+
+
+def write(tmp_path, text, name="bookmarks.html"):
+    p = tmp_path / name
+    p.write_text(text, encoding="utf-8")
+    return str(p)
+
+
+def summarize(root):
+    """(depth, kind, name/title, href) for every node, in document order."""
+    out = []
+    stack = [(iter(root.children), 0)]
+    while stack:
+        it, depth = stack[-1]
+        for ch in it:
+            if isinstance(ch, (chromium.Folder, flat.Folder)):
+                out.append((depth, "folder", ch.name, None))
+                stack.append((iter(ch.children), depth + 1))
+                break
+            out.append((depth, "bookmark", ch.title, ch.href))
+        else:
+            stack.pop()
+    return out
+
+
+def parse_lxml(mod, path):
+    parser = mod.NetscapeParser()
+    mod.parse_with_lxml(path, parser)
+    return parser.root
+
+
+def parse_fallback(mod, text, chunk=None):
+    parser = mod.NetscapeParser()
+    chunk = chunk or len(text)
+    for i in range(0, len(text), chunk):
+        parser.feed(text[i:i + chunk])
+    parser.close()
+    return parser.root
+
+
+@pytest.mark.parametrize("mod", SCRIPTS)
+def test_lxml_path_parses_real_export(mod, tmp_path):
+    pytest.importorskip("lxml")
+    path = write(tmp_path, REAL_EXPORT)
+    nodes = summarize(parse_lxml(mod, path))
+    assert (0, "folder", "Folder one", None) in nodes
+    assert (1, "bookmark", "Foo bold", "https://a.example/") in nodes
+    assert (0, "bookmark", "Top & more", "https://top.example/") in nodes
+
+
+@pytest.mark.parametrize("mod", SCRIPTS)
+def test_lxml_and_fallback_agree(mod, tmp_path):
+    pytest.importorskip("lxml")
+    path = write(tmp_path, REAL_EXPORT)
+    assert summarize(parse_fallback(mod, REAL_EXPORT)) == summarize(parse_lxml(mod, path))
+
+
+
+@pytest.mark.parametrize("mod", SCRIPTS)
+@pytest.mark.parametrize("use_lxml", [True, False])
+def test_parse_bookmarks_returns_root_and_stats(mod, tmp_path, monkeypatch, use_lxml):
+    if use_lxml:
+        pytest.importorskip("lxml")
+    else:
+        monkeypatch.setattr(mod, "etree", None)
+    root, stats = mod.parse_bookmarks(write(tmp_path, REAL_EXPORT))
+    assert summarize(root) == summarize(parse_fallback(mod, REAL_EXPORT))
+    if mod is chromium:
+        assert stats == {"urls_kept": 3, "urls_removed": 0, "folders_pruned": 0}
+    else:
+        assert stats == {}
+@pytest.mark.parametrize("mod", SCRIPTS)
+@pytest.mark.parametrize("chunk", [7, 64 * 1024])
+def test_fallback_attribute_quoting(mod, chunk):
+    nodes = summarize(parse_fallback(mod, """<DL><p>
+    <DT><A HREF='http://single.org/' ADD_DATE=2>Single</A>
+    <DT><A HREF="https://x.y/a>b" ICON="data:x">Gt</A>
+    <DT><A HREF=http://bare.org/ CHECKED>Bare</A>
+    <DT><A HREF=http://x.org/it's ADD_DATE=4>Apostrophe</A>
+</DL><p>
+""", chunk))
+    assert nodes == [
+        (0, "bookmark", "Single", "http://single.org/"),
+        (0, "bookmark", "Gt", "https://x.y/a>b"),
+        (0, "bookmark", "Bare", "http://bare.org/"),
+        (0, "bookmark", "Apostrophe", "http://x.org/it's"),
+    ]
+
+
+@pytest.mark.parametrize("mod", SCRIPTS)
+@pytest.mark.parametrize("chunk", [7, 64 * 1024])
+def test_fallback_comments_and_stray_lt(mod, chunk):
+    nodes = summarize(parse_fallback(mod, """<DL><p>
+    <!-- <DT><A HREF="http://commented.org/">C</A> -->
+    <DT><A HREF="http://lt.org/">It's 1 < 2 &amp; 3 > 2</A>
+    <DT><H3>Folder <!-- <b> --></H3>
+    <DL><p>
+    </DL><p>
+</DL><p>
+""", chunk))
+    assert nodes == [
+        (0, "bookmark", "It's 1 < 2 & 3 > 2", "http://lt.org/"),
+        (0, "folder", "Folder", None),
+    ]
+
+
+def run_script(mod, path, out, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["prog", path, "-o", out])
+    mod.main()
+    with open(out, encoding="utf-8") as f:
+        return f.read()
+
+
+EMPTY_ATTRS = """<DL><p>
+    <DT><H3 ADD_DATE="" LAST_MODIFIED="2">Folder</H3>
+    <DL><p>
+        <DT><A HREF="https://a.example/" ADD_DATE="">A</A>
+    </DL><p>
+</DL><p>
+"""
+
+
+@pytest.mark.parametrize("mod", SCRIPTS)
+def test_empty_h3_attrs_are_written(mod, tmp_path, monkeypatch):
+    path = write(tmp_path, EMPTY_ATTRS)
+    html = run_script(mod, path, str(tmp_path / "out.html"), monkeypatch)
+    assert '<H3 ADD_DATE="" LAST_MODIFIED="2">Folder</H3>' in html
+
+
+@pytest.mark.parametrize("mod", SCRIPTS)
+def test_empty_bookmark_attrs_are_written(mod, tmp_path, monkeypatch):
+    path = write(tmp_path, EMPTY_ATTRS)
+    html = run_script(mod, path, str(tmp_path / "out.html"), monkeypatch)
+    assert '<A HREF="https://a.example/" ADD_DATE="">A</A>' in html
+
+
+def test_parallel_merge_handles_deep_nesting(tmp_path):
+    depth = 400
+    deep = ("<DL><p>\n" + "<DT><H3>f</H3>\n<DL><p>\n" * depth
+            + '<DT><A HREF="http://deep.example/">deep</A>\n'
+            + "</DL><p>\n" * depth + "</DL><p>\n")
+    paths = [write(tmp_path, deep, "deep.html"), write(tmp_path, REAL_EXPORT, "real.html")]
+    assert summarize(flat.parse_all(paths, jobs=2)) == summarize(flat.parse_all(paths, jobs=1))
+
+
+def urlsplit_normalize(mod, u):
+    """normalize_url with the _SIMPLE_URL_RE fast path taken out."""
+    s = urlsplit(u)
+    path = s.path.rstrip("/") if s.path.endswith("/") and s.path != "/" else s.path
+    query = "&".join(p for p in s.query.split("&")
+                     if p and p.split("=", 1)[0] not in mod.COMMON_TRACKING_PARAMS)
+    return urlunsplit((s.scheme.lower(), s.netloc.lower(), path, query, "")) or u
+
+
+@pytest.mark.parametrize("mod", SCRIPTS)
+@pytest.mark.parametrize("url", [
+    "http://[::1]:80/x?q=1",
+    "https://user:pw@Host.COM/a/",
+    "file:///etc/x",
+    " http://a.com/",
+    "http://a.com/\tx",
+    "\x01http://a.com/",
+    "http://a.com/p#frag?x=1",
+    "HTTPS://EXAMPLE.com/A/",
+    "http://a.com/?utm_source=x&q=1&ref=2",
+    "http://a.com?gclid=1",
+    "http://a.com/p?&&x=1#top",
+    "http://a.com",
+])
+def test_normalize_url_matches_urlsplit(mod, url):
+    assert mod.normalize_url(url) == urlsplit_normalize(mod, url)
+
+
+@pytest.mark.parametrize("mod", SCRIPTS)
+def test_normalize_url_drops_tracking_params(mod):
+    assert mod.normalize_url("HTTPS://Example.com/A/?utm_source=x&q=1&ref=2#f") == "https://example.com/A?q=1"